@@ -12,5 +12,5 @@ router_list = [
     chat_router,
 ]
 
-for router in router_list:
-    routers.include_router(router)
+for child_router in router_list:
+    routers.include_router(child_router)
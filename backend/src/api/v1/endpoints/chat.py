@@ -2,7 +2,7 @@ import json
 
 from dependency_injector.wiring import Provide, inject
 from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from src.core.container import Container
 from src.schemas.chat_schema import ChatRequest
@@ -11,7 +11,7 @@ from src.services.chat_service import ChatService
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-@router.post("/")
+@router.post("/", response_class=ORJSONResponse)
 @inject
 async def chat(
     chat_request: ChatRequest,
@@ -1,6 +1,6 @@
 import logging
 from enum import Enum
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from typing import Optional
 
 from dotenv import load_dotenv
@@ -38,16 +38,26 @@ class Config(BaseSettings):
     API_STR: str = "/api"
     MCP_STR: str = "/mcp"
     MCP_SERVER_URL: str = "http://127.0.0.1:8000/mcp"
+    MCP_MAX_CONCURRENT: int = 8
     PROJECT_NAME: str = "Kurious FastAPI Template"
     DEBUG: Optional[bool] = None
+    # Size of the AnyIO threadpool that serves sync work (sync tools, sync
+    # dependencies). The hot path is fully async, so the Starlette default
+    # of 40 threads is mostly idle memory.
+    FASTAPI_THREADPOOL: int = 16
 
     # CORS
     CORS_ORIGINS_STR: Optional[str] = ""
-    BACKEND_CORS_ORIGINS: Optional[list[str]] = (
-        [origin.strip() for origin in CORS_ORIGINS_STR.split(",")]
-        if CORS_ORIGINS_STR
-        else ["*"]
-    )
+
+    @cached_property
+    def BACKEND_CORS_ORIGINS(self) -> list[str]:
+        if not self.CORS_ORIGINS_STR:
+            return []
+        return [
+            origin.strip()
+            for origin in self.CORS_ORIGINS_STR.split(",")
+            if origin.strip()
+        ]
 
     # Database
     DATABASE_URL: Optional[str] = None
@@ -58,6 +68,10 @@ class Config(BaseSettings):
     DB_PASSWORD: SecretStr
     DB_SSL: Optional[str] = None
     DB_FORCE_ROLL_BACK: bool = False
+    # Prepared statements collide with PgBouncer in transaction mode; only
+    # disable server-side caching when actually deployed behind it.
+    DB_PGBOUNCER: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 1024
 
     @model_validator(mode="after")
     def set_debug_default(self):
@@ -65,7 +79,7 @@ class Config(BaseSettings):
             self.DEBUG = self.ENV == EnvironmentOption.DEV
         return self
 
-    @property
+    @cached_property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         from urllib.parse import quote_plus
 
@@ -78,9 +92,20 @@ class Config(BaseSettings):
             f"{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
 
+    @cached_property
+    def SQLALCHEMY_POSTGRES_URI(self) -> str:
+        # psycopg/asyncpg expect the plain postgresql:// scheme
+        return self.SQLALCHEMY_DATABASE_URI.replace(
+            "postgresql+asyncpg://", "postgresql://"
+        )
+
     @property
     def SQLALCHEMY_CONNECT_ARGS(self) -> dict[str, object]:
-        args: dict[str, object] = {"statement_cache_size": 0}
+        args: dict[str, object] = {
+            "statement_cache_size": (
+                0 if self.DB_PGBOUNCER else self.DB_STATEMENT_CACHE_SIZE
+            )
+        }
 
         if self.DB_SSL:
             ssl_mode = self.DB_SSL.strip().lower()
@@ -95,6 +120,10 @@ class Config(BaseSettings):
     # LLM Configs
     LLM_PROVIDER: LLMProvider = LLMProvider.OPENAI
     MODEL_NAME: Optional[str] = None
+    SUMMARY_MODEL_NAME: Optional[str] = None
+    # Graph debug tracing serializes full state per node; keep it opt-in
+    # rather than coupled to app-level DEBUG.
+    CHAT_DEBUG: bool = False
 
     OPENAI_API_KEY: Optional[SecretStr] = None
     HUGGINGFACE_API_TOKEN: Optional[SecretStr] = None
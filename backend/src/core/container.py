@@ -4,6 +4,7 @@ from src.core.config import get_config
 from src.core.database import Database
 from src.repository.user_repository import UserRepository
 from src.services.chat_service import ChatService
+from src.services.llm import create_chat_model
 from src.services.user_service import UserService
 
 
@@ -30,7 +31,10 @@ class Container(containers.DeclarativeContainer):
         user_repository=user_repository,
     )
 
-    chat_service = providers.Factory(
+    chat_model = providers.Singleton(create_chat_model, config=config)
+
+    chat_service = providers.Singleton(
         ChatService,
         config=config,
+        model=chat_model,
     )
@@ -2,8 +2,10 @@ import logging
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 
+from anyio import to_thread
 from fastapi import FastAPI
 
+from src.core.config import config
 from src.core.logging_conf import configure_logging
 
 logger = logging.getLogger(__name__)
@@ -13,10 +15,15 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     configure_logging()
 
+    to_thread.current_default_thread_limiter().total_tokens = (
+        config.FASTAPI_THREADPOOL
+    )
+
     # Initialize container resources
     if hasattr(app.state, "container"):
         app.state.container.init_resources()
         logger.info("Container resources initialized")
+        await app.state.container.chat_service().warmup()
 
     logger.info("Startup event completed")
 
@@ -24,6 +31,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
 
     # Shutdown container resources
     if hasattr(app.state, "container"):
+        await app.state.container.chat_service().aclose()
         app.state.container.shutdown_resources()
         logger.info("Container resources shutdown")
 
@@ -4,6 +4,7 @@ import os
 from asgi_correlation_id import CorrelationIdMiddleware
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from fastapi_mcp import FastApiMCP
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from sqlalchemy.exc import SQLAlchemyError
@@ -49,6 +50,7 @@ class AppCreator:
             version="0.0.1",
             root_path=os.getenv("API_ROOT_PATH", "/"),
             lifespan=lifespan,
+            default_response_class=ORJSONResponse,
         )
 
         self._configure_monitoring()
@@ -1,10 +1,16 @@
+import asyncio
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 from typing import Any, AsyncIterator
 
 from langchain.agents import create_agent
 from langchain.agents.middleware import SummarizationMiddleware
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from src.core.config import Config
 from src.core.exceptions import NotFoundError
@@ -14,9 +20,16 @@ logger = logging.getLogger(__name__)
 
 
 class ChatService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, model: Any):
         self.config = config
-        self.model = ChatModel().create(config)
+        self.model = model
+        if config.SUMMARY_MODEL_NAME:
+            summary_config = config.model_copy(
+                update={"MODEL_NAME": config.SUMMARY_MODEL_NAME}
+            )
+            self.summary_model = ChatModel().create(summary_config)
+        else:
+            self.summary_model = self.model
         self._mcp_client = MultiServerMCPClient(
             {
                 "kurious-tools": {
@@ -25,24 +38,186 @@ class ChatService:
                 }
             }
         )
+        self._pool: AsyncConnectionPool | None = None
+        self._checkpointer: AsyncPostgresSaver | None = None
+        self._checkpointer_lock = asyncio.Lock()
+        self._tools_cache: list[Any] | None = None
+        self._tools_cache_expiry: float = 0.0
+        self._tools_lock = asyncio.Lock()
+        self._tool_semaphore = asyncio.Semaphore(config.MCP_MAX_CONCURRENT)
+        self._tools_version: int = 0
+        self._tool_names: list[str] | None = None
+        self._agent: Any | None = None
+        self._agent_tools_version: int = -1
+        self._agent_lock = asyncio.Lock()
+        self._idem_cache: OrderedDict[
+            tuple[str, str], tuple[float, dict[str, Any]]
+        ] = OrderedDict()
+        self._idem_locks: dict[tuple[str, str], asyncio.Lock] = {}
 
-    async def _load_tools(self) -> list[Any]:
-        try:
-            tools = await self._mcp_client.get_tools()
-            logger.info(
-                f"Loaded {len(tools)} MCP tools from {self.config.MCP_SERVER_URL}"
+    async def _get_checkpointer(self) -> AsyncPostgresSaver:
+        if self._checkpointer is not None:
+            return self._checkpointer
+
+        async with self._checkpointer_lock:
+            if self._checkpointer is not None:
+                return self._checkpointer
+
+            pool = AsyncConnectionPool(
+                conninfo=self.config.SQLALCHEMY_POSTGRES_URI,
+                min_size=5,
+                max_size=20,
+                open=False,
+                check=AsyncConnectionPool.check_connection,
+                kwargs={
+                    "autocommit": True,
+                    # Checkpoint reads/writes repeat the same few statements
+                    # every graph node; let Postgres cache the plans unless
+                    # PgBouncer's transaction pooling makes that unsafe.
+                    "prepare_threshold": 0 if self.config.DB_PGBOUNCER else 5,
+                    "row_factory": dict_row,
+                },
             )
-            return tools
+            try:
+                await pool.open(wait=True)
+
+                checkpointer = AsyncPostgresSaver(pool)
+                # Setup the checkpointer (create tables if needed), serialized
+                # across uvicorn workers so parallel startups don't race the DDL.
+                async with pool.connection() as conn:
+                    await conn.execute(
+                        "SELECT pg_advisory_lock("
+                        "hashtext('langgraph_checkpoint_setup'))"
+                    )
+                    try:
+                        await checkpointer.setup()
+                    finally:
+                        await conn.execute(
+                            "SELECT pg_advisory_unlock("
+                            "hashtext('langgraph_checkpoint_setup'))"
+                        )
+            except Exception:
+                # Close the pool before surfacing the error, otherwise each
+                # lazy retry would leak another set of live connections.
+                await pool.close()
+                raise
+
+            self._pool = pool
+            self._checkpointer = checkpointer
+            logger.info("Checkpointer connection pool opened")
+            return checkpointer
+
+    async def warmup(self) -> None:
+        """Pay one-time costs at startup instead of on the first request.
+
+        Opens the checkpointer pool (including its schema setup), fetches the
+        MCP tool catalog, and compiles the agent graph. Failures are logged
+        and retried lazily on the first request.
+        """
+        try:
+            await self._get_agent()
+            logger.info("Chat service warmed up")
         except Exception as exc:
-            logger.warning(f"Falling back to no tools. MCP load failed: {exc}")
-            return []
+            logger.warning(f"Chat service warmup failed: {exc}")
+
+    async def aclose(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+            self._checkpointer = None
+            logger.info("Checkpointer connection pool closed")
+
+    # Tool catalogs change rarely; refetching per turn costs an HTTP round-trip.
+    TOOLS_CACHE_TTL = 300.0
+    # Retried (thread_id, message) pairs within this window get the cached
+    # response instead of re-running the whole LLM + tool chain.
+    IDEM_TTL = 60.0
+    IDEM_MAX_ENTRIES = 4096
+
+    async def _load_tools(self) -> list[Any]:
+        if self._tools_cache is not None and time.monotonic() < self._tools_cache_expiry:
+            return self._tools_cache
+
+        async with self._tools_lock:
+            # Another caller may have refreshed while we waited for the lock.
+            if (
+                self._tools_cache is not None
+                and time.monotonic() < self._tools_cache_expiry
+            ):
+                return self._tools_cache
+
+            try:
+                tools = await self._mcp_client.get_tools()
+                logger.info(
+                    f"Loaded {len(tools)} MCP tools from {self.config.MCP_SERVER_URL}"
+                )
+            except Exception as exc:
+                logger.warning(f"Falling back to no tools. MCP load failed: {exc}")
+                tools = []
+
+            tools = [self._bound_concurrency(tool) for tool in tools]
+            tool_names = [str(getattr(tool, "name", "")) for tool in tools]
+            if tool_names != self._tool_names:
+                self._tool_names = tool_names
+                self._tools_version += 1
+            self._tools_cache = tools
+            self._tools_cache_expiry = time.monotonic() + self.TOOLS_CACHE_TTL
+            return tools
+
+    async def _get_agent(self) -> Any:
+        checkpointer = await self._get_checkpointer()
+        tools = await self._load_tools()
+
+        if self._agent is not None and self._agent_tools_version == self._tools_version:
+            return self._agent
+
+        async with self._agent_lock:
+            if self._agent is None or self._agent_tools_version != self._tools_version:
+                self._agent = create_agent(
+                    model=self.model,
+                    tools=tools,
+                    checkpointer=checkpointer,
+                    debug=self.config.CHAT_DEBUG,
+                    middleware=[
+                        SummarizationMiddleware(
+                            model=self.summary_model,
+                            trigger=("tokens", 2000),
+                            keep=("messages", 10),
+                        ),
+                    ],
+                )
+                self._agent_tools_version = self._tools_version
+                logger.info("Agent graph compiled")
+            return self._agent
+
+    def _bound_concurrency(self, tool: Any) -> Any:
+        """Gate a tool's coroutine behind the shared semaphore.
+
+        The agent executes a batch of tool calls concurrently; the semaphore
+        caps the fan-out against the MCP server at MCP_MAX_CONCURRENT.
+        """
+        inner = getattr(tool, "coroutine", None)
+        if inner is None:
+            return tool
+
+        async def bounded(*args: Any, **kwargs: Any) -> Any:
+            async with self._tool_semaphore:
+                return await inner(*args, **kwargs)
+
+        tool.coroutine = bounded
+        return tool
 
     def _normalize_content(self, value: Any) -> str:
-        if isinstance(value, list):
-            return " ".join(
-                str(part.get("text", "")) if isinstance(part, dict) else str(part)
-                for part in value
-            ).strip()
+        # Content values from the model are plain str/list/dict, never
+        # subclasses, so exact type checks skip isinstance's MRO walk.
+        if type(value) is str:
+            return value
+        if type(value) is list:
+            parts: list[str] = []
+            append = parts.append
+            for part in value:
+                append(str(part.get("text", "")) if type(part) is dict else str(part))
+            return " ".join(parts).strip()
         return str(value)
 
     def _json_safe(self, value: Any) -> Any:
@@ -80,202 +255,193 @@ class ChatService:
             return self._normalize_content(getattr(value, "content", ""))
         return self._json_safe(value)
 
-    def _extract_tool_calls(self, messages: list[Any]) -> list[dict[str, Any]]:
-        call_map: dict[str, dict[str, Any]] = {}
-
-        for msg in messages:
-            raw_calls = getattr(msg, "tool_calls", None) or []
-            for call in raw_calls:
-                call_id = str(call.get("id") or f"tool-{len(call_map) + 1}")
-                call_map[call_id] = {
-                    "id": call_id,
-                    "name": str(call.get("name") or call.get("tool") or "tool"),
-                    "input": self._sanitize_tool_input(call.get("args")),
-                    "status": "running",
-                }
-
-        for msg in messages:
-            tool_call_id = getattr(msg, "tool_call_id", None)
-            if tool_call_id and tool_call_id in call_map:
-                call_map[tool_call_id]["output"] = self._sanitize_tool_output(
-                    getattr(msg, "content", "")
-                )
-                call_map[tool_call_id]["status"] = "completed"
+    def _idem_get(self, key: tuple[str, str]) -> dict[str, Any] | None:
+        entry = self._idem_cache.get(key)
+        if entry is None:
+            return None
+        expiry, payload = entry
+        if time.monotonic() >= expiry:
+            self._idem_cache.pop(key, None)
+            return None
+        self._idem_cache.move_to_end(key)
+        return payload
 
-        return list(call_map.values())
+    def _idem_put(self, key: tuple[str, str], payload: dict[str, Any]) -> None:
+        self._idem_cache[key] = (time.monotonic() + self.IDEM_TTL, payload)
+        self._idem_cache.move_to_end(key)
+        while len(self._idem_cache) > self.IDEM_MAX_ENTRIES:
+            self._idem_cache.popitem(last=False)
 
     async def generate_response(self, message: str, thread_id: str) -> dict[str, Any]:
-        # asyncpg expects postgresql:// scheme
-        conn_string = self.config.SQLALCHEMY_DATABASE_URI.replace(
-            "postgresql+asyncpg://", "postgresql://"
+        idem_key = (
+            thread_id,
+            hashlib.blake2b(message.encode(), digest_size=16).hexdigest(),
         )
+        cached = self._idem_get(idem_key)
+        if cached is not None:
+            return cached
 
-        async with AsyncPostgresSaver.from_conn_string(conn_string) as checkpointer:
-            # Setup the checkpointer (create tables if needed)
-            await checkpointer.setup()
-            tools = await self._load_tools()
-
-            agent = create_agent(
-                model=self.model,
-                tools=tools,
-                checkpointer=checkpointer,
-                debug=True if self.config.DEBUG else False,
-                middleware=[
-                    SummarizationMiddleware(
-                        model=self.model,
-                        trigger=("tokens", 2000),
-                        keep=("messages", 10),
-                    ),
-                ],
-            )
+        lock = self._idem_locks.setdefault(idem_key, asyncio.Lock())
+        try:
+            async with lock:
+                # A concurrent duplicate may have finished while we waited.
+                cached = self._idem_get(idem_key)
+                if cached is not None:
+                    return cached
 
-            response = await agent.ainvoke(
-                {"messages": [{"role": "user", "content": message}]},
-                {"configurable": {"thread_id": thread_id}},
-            )
-            messages = response["messages"]
-            final_message = messages[-1]
-            content = self._normalize_content(final_message.content)
-            tool_calls = self._extract_tool_calls(messages)
-            return {
-                "content": str(content),
-                "tool_calls": tool_calls,
-                "conversation_id": thread_id,
-                "response_id": str(getattr(final_message, "id", "")),
-            }
+                final_payload: dict[str, Any] | None = None
+                async for event in self.stream_response(message, thread_id):
+                    if event.get("type") == "final":
+                        final_payload = event
+
+                if final_payload is None:
+                    return {
+                        "content": "",
+                        "tool_calls": [],
+                        "conversation_id": thread_id,
+                        "response_id": "",
+                    }
+
+                payload = {
+                    key: value
+                    for key, value in final_payload.items()
+                    if key != "type"
+                }
+                self._idem_put(idem_key, payload)
+                return payload
+        finally:
+            self._idem_locks.pop(idem_key, None)
 
     async def stream_response(
         self, message: str, thread_id: str
     ) -> AsyncIterator[dict[str, Any]]:
-        # asyncpg expects postgresql:// scheme
-        conn_string = self.config.SQLALCHEMY_DATABASE_URI.replace(
-            "postgresql+asyncpg://", "postgresql://"
-        )
+        agent = await self._get_agent()
 
-        async with AsyncPostgresSaver.from_conn_string(conn_string) as checkpointer:
-            await checkpointer.setup()
-            tools = await self._load_tools()
-
-            agent = create_agent(
-                model=self.model,
-                tools=tools,
-                checkpointer=checkpointer,
-                debug=True if self.config.DEBUG else False,
-                middleware=[
-                    SummarizationMiddleware(
-                        model=self.model,
-                        trigger=("tokens", 2000),
-                        keep=("messages", 10),
-                    ),
-                ],
-            )
+        token_buffer: list[str] = []
+        tool_runs: dict[str, dict[str, Any]] = {}
+        final_payload: dict[str, Any] | None = None
+
+        async for event in agent.astream_events(
+            {"messages": [{"role": "user", "content": message}]},
+            {"configurable": {"thread_id": thread_id}},
+            version="v2",
+        ):
+            event_name = event.get("event")
 
-            token_buffer: list[str] = []
-            tool_runs: dict[str, dict[str, Any]] = {}
-            final_payload: dict[str, Any] | None = None
+            if event_name == "on_chat_model_stream":
+                chunk = event.get("data", {}).get("chunk")
+                chunk_text = self._normalize_content(
+                    getattr(chunk, "content", "") if chunk else ""
+                )
+                if chunk_text:
+                    token_buffer.append(chunk_text)
+                    yield {"type": "token", "content": chunk_text}
+                continue
 
-            async for event in agent.astream_events(
-                {"messages": [{"role": "user", "content": message}]},
-                {"configurable": {"thread_id": thread_id}},
-                version="v2",
-            ):
-                event_name = event.get("event")
+            if event_name == "on_tool_start":
+                run_id = str(event.get("run_id"))
+                tool_name = str(event.get("name") or "tool")
+                tool_input = self._sanitize_tool_input(
+                    event.get("data", {}).get("input")
+                )
+                tool_runs[run_id] = {
+                    "id": run_id,
+                    "name": tool_name,
+                    "input": tool_input,
+                    "status": "running",
+                }
+                yield {
+                    "type": "tool_start",
+                    "id": run_id,
+                    "name": tool_name,
+                    "input": tool_input,
+                }
+                continue
 
-                if event_name == "on_chat_model_stream":
-                    chunk = event.get("data", {}).get("chunk")
-                    chunk_text = self._normalize_content(
-                        getattr(chunk, "content", "") if chunk else ""
-                    )
-                    if chunk_text:
-                        token_buffer.append(chunk_text)
-                        yield {"type": "token", "content": chunk_text}
-                    continue
-
-                if event_name == "on_tool_start":
-                    run_id = str(event.get("run_id"))
-                    tool_name = str(event.get("name") or "tool")
-                    tool_input = self._sanitize_tool_input(
-                        event.get("data", {}).get("input")
-                    )
+            if event_name == "on_tool_end":
+                run_id = str(event.get("run_id"))
+                tool_name = str(event.get("name") or "tool")
+                output = self._sanitize_tool_output(
+                    event.get("data", {}).get("output")
+                )
+                if run_id in tool_runs:
+                    tool_runs[run_id]["output"] = output
+                    tool_runs[run_id]["status"] = "completed"
+                else:
                     tool_runs[run_id] = {
                         "id": run_id,
                         "name": tool_name,
-                        "input": tool_input,
-                        "status": "running",
-                    }
-                    yield {
-                        "type": "tool_start",
-                        "id": run_id,
-                        "name": tool_name,
-                        "input": tool_input,
+                        "output": output,
+                        "status": "completed",
                     }
-                    continue
+                yield {
+                    "type": "tool_end",
+                    "id": run_id,
+                    "name": tool_name,
+                    "output": output,
+                }
+                continue
 
-                if event_name == "on_tool_end":
-                    run_id = str(event.get("run_id"))
-                    tool_name = str(event.get("name") or "tool")
-                    output = self._sanitize_tool_output(
-                        event.get("data", {}).get("output")
-                    )
-                    if run_id in tool_runs:
-                        tool_runs[run_id]["output"] = output
-                        tool_runs[run_id]["status"] = "completed"
-                    else:
-                        tool_runs[run_id] = {
-                            "id": run_id,
-                            "name": tool_name,
-                            "output": output,
-                            "status": "completed",
+            if event_name == "on_chain_end":
+                output = event.get("data", {}).get("output")
+                if isinstance(output, dict) and isinstance(
+                    output.get("messages"), list
+                ):
+                    messages = output["messages"]
+                    if messages:
+                        final_message = messages[-1]
+                        final_content = self._normalize_content(
+                            getattr(final_message, "content", "")
+                        )
+                        if final_content:
+                            token_buffer = [final_content]
+
+                        response_id = str(getattr(final_message, "id", ""))
+                        final_payload = {
+                            "type": "final",
+                            "content": "".join(token_buffer).strip(),
+                            "tool_calls": list(tool_runs.values()),
+                            "conversation_id": thread_id,
+                            "response_id": response_id,
                         }
-                    yield {
-                        "type": "tool_end",
-                        "id": run_id,
-                        "name": tool_name,
-                        "output": output,
-                    }
-                    continue
 
-                if event_name == "on_chain_end":
-                    output = event.get("data", {}).get("output")
-                    if isinstance(output, dict) and isinstance(
-                        output.get("messages"), list
-                    ):
-                        messages = output["messages"]
-                        if messages:
-                            final_message = messages[-1]
-                            final_content = self._normalize_content(
-                                getattr(final_message, "content", "")
-                            )
-                            if final_content:
-                                token_buffer = [final_content]
-
-                            response_id = str(getattr(final_message, "id", ""))
-                            final_payload = {
-                                "type": "final",
-                                "content": "".join(token_buffer).strip(),
-                                "tool_calls": list(tool_runs.values()),
-                                "conversation_id": thread_id,
-                                "response_id": response_id,
-                            }
-
-            if final_payload is None:
-                final_payload = {
-                    "type": "final",
-                    "content": "".join(token_buffer).strip(),
-                    "tool_calls": list(tool_runs.values()),
-                    "conversation_id": thread_id,
-                    "response_id": "",
-                }
+        if final_payload is None:
+            final_payload = {
+                "type": "final",
+                "content": "".join(token_buffer).strip(),
+                "tool_calls": list(tool_runs.values()),
+                "conversation_id": thread_id,
+                "response_id": "",
+            }
 
-            yield final_payload
+        yield final_payload
 
     async def reset_thread(self, thread_id: str) -> None:
         try:
-            conn_string = self.config.SQLALCHEMY_DATABASE_URI.replace(
-                "postgresql+asyncpg://", "postgresql://"
-            )
-            async with AsyncPostgresSaver.from_conn_string(conn_string) as checkpointer:
-                await checkpointer.adelete_thread(thread_id)
+            checkpointer = await self._get_checkpointer()
+            await checkpointer.adelete_thread(thread_id)
         except Exception:
             logger.error(f"Failed to reset thread: {thread_id}")
             raise NotFoundError(detail=f"Thread {thread_id} not found")
+
+    async def reset_threads_bulk(self, thread_ids: list[str]) -> None:
+        """Delete all checkpoints for several threads in one transaction."""
+        if not thread_ids:
+            return
+        await self._get_checkpointer()
+        pool = self._pool
+        try:
+            async with pool.connection() as conn:
+                async with conn.transaction():
+                    for table in (
+                        "checkpoints",
+                        "checkpoint_blobs",
+                        "checkpoint_writes",
+                    ):
+                        await conn.execute(
+                            f"DELETE FROM {table} WHERE thread_id = ANY(%s)",
+                            (thread_ids,),
+                        )
+        except Exception:
+            logger.error(f"Failed to reset threads: {thread_ids}")
+            raise NotFoundError(detail="Threads not found")
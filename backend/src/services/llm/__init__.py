@@ -1,3 +1,3 @@
-from src.services.llm.factory import ChatModel
+from src.services.llm.factory import ChatModel, create_chat_model
 
-__all__ = ["ChatModel"]
+__all__ = ["ChatModel", "create_chat_model"]
@@ -18,3 +18,12 @@ class ChatModel:
         if provider is None:
             raise ValueError(f"Unsupported LLM_PROVIDER: {config.LLM_PROVIDER}")
         return provider.create(config)
+
+
+def create_chat_model(config: Config) -> Any:
+    """Container factory for the shared chat model singleton.
+
+    Each model instance owns an HTTP client; constructing it once keeps
+    connections (and TLS sessions) alive across services and requests.
+    """
+    return ChatModel().create(config)
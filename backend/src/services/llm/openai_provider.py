@@ -1,4 +1,3 @@
-import os
 from typing import Any
 
 from langchain.chat_models import init_chat_model
@@ -14,5 +13,7 @@ class OpenAIChatModelProvider(ChatModelProvider):
         if not config.MODEL_NAME:
             raise ValueError("MODEL_NAME is required when LLM_PROVIDER=openai")
 
-        os.environ["OPENAI_API_KEY"] = config.OPENAI_API_KEY.get_secret_value()
-        return init_chat_model(config.MODEL_NAME)
+        return init_chat_model(
+            config.MODEL_NAME,
+            api_key=config.OPENAI_API_KEY.get_secret_value(),
+        )